@@ -1,12 +1,33 @@
 import dash
 from dash import html, dcc, Input, Output, State, callback_context
-import requests
+import httpx
 import plotly.graph_objs as go
 import pandas as pd
+import numpy as np
 import dash_bootstrap_components as dbc
 import os
+import functools
+import logging
+import importlib.util
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
+try:
+    import orjson
+except ImportError:  # fall back to httpx's stdlib json parsing
+    orjson = None
+
+try:
+    import pyarrow  # needed by DataFrame.to_feather
+except ImportError:  # fall back to CSV for the raw/cleaned archives
+    pyarrow = None
+
+try:
+    from numba import njit
+except ImportError:  # fall back to the NumPy implementation of process_day
+    njit = None
+
 # --- City Data ---
 CITIES = {
     "NEW YORK": (40.7128, -74.0060),
@@ -22,10 +43,33 @@ CITIES = {
 RAW_DATA_DIR = "raw_weather_data"
 CLEAN_DATA_DIR = "cleaned_weather_data"
 REPORT_DIR = "weather_reports"
+NUMERIC_COLUMNS = ["temperature", "wind_speed", "humidity", "precipitation"]
+EXPORT_CSV = False  # also write human-readable CSV copies of the raw/cleaned feather files
 os.makedirs(RAW_DATA_DIR, exist_ok=True)
 os.makedirs(CLEAN_DATA_DIR, exist_ok=True)
 os.makedirs(REPORT_DIR, exist_ok=True)
 
+# --- API Client & Forecast Cache ---
+FORECAST_CACHE_TTL = timedelta(minutes=10)
+FORECAST_CACHE_SIZE = 64
+_forecast_cache = {}  # (city_upper, target_date) -> (fetched_at, df_clean)
+_forecast_cache_lock = threading.Lock()  # guards _forecast_cache and _fetch_locks
+_fetch_locks = {}  # (city_upper, target_date) -> lock held while that key is fetched; bounded by cities x pickable dates
+_last_render = {}  # tuple(render_key) -> (feature_cards, fig) from full callback runs, newest last
+_last_render_lock = threading.Lock()
+
+API_TIMEOUT = 10.0
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None  # httpx needs h2 for HTTP/2
+
+# One shared client (thread-safe), so its keep-alive pool and TLS sessions are reused by callbacks on every worker thread
+_client = httpx.Client(http2=HTTP2_AVAILABLE, timeout=API_TIMEOUT)
+
+# --- Background File Writer ---
+# Single worker so two writes to the same path can never run at once
+_file_writer = ThreadPoolExecutor(max_workers=1)
+_last_written = {}  # (data_dir, city_upper, date) -> content hash of the last file written successfully
+logger = logging.getLogger(__name__)
+
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 app.title = "Weather Dashboard"
 
@@ -137,30 +181,340 @@ app.layout = dbc.Container([
             dcc.Graph(id="weather-graph"),
             html.Div(id="forecast-table"),
             dcc.ConfirmDialog(id='alert-popup', message=''),
+            dcc.Store(id='render-signature'),
         ], md=8)
     ])
 ], fluid=True)
 
+# --- Feature Card Templates ---
+# Static parts of the icon cards, built once and shared by reference across callbacks
+FEATURE_LABELS = {
+    "temperature": "Temperature",
+    "wind_speed": "Wind Speed",
+    "humidity": "Humidity",
+    "precipitation": "Precipitation"
+}
+STATIC_ICONS = {
+    "wind_speed": "🌬️",
+    "humidity": "💧",
+}
+_CARD_STYLE = {"width": "10rem", "display": "inline-block"}
+_H2_STYLE = {"font-size": "3rem"}
+_P_STYLE = {"font-size": "1.5rem", "font-weight": "bold"}
+
+@functools.lru_cache(maxsize=None)
+def card_title(feat):
+    return html.H4(FEATURE_LABELS[feat], className="card-title")
+
 # --- Helper Functions ---
-def save_raw_data(city_upper, df):
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filepath = os.path.join(RAW_DATA_DIR, f"{city_upper}_raw_{timestamp}.csv")
-    df.to_csv(filepath, index=False)
+def submit_write(df, key, write):
+    # Skip unchanged content and keep the disk write off the callback thread; the hash is
+    # only recorded once the write succeeded, so a failed write is retried next time
+    content_hash = pd.util.hash_pandas_object(df, index=False).sum()
+    if _last_written.get(key) == content_hash:
+        return
+
+    def on_done(future):
+        error = future.exception()
+        if error is None:
+            _last_written[key] = content_hash
+        else:
+            logger.error("Writing %s failed", key, exc_info=error)
+
+    _file_writer.submit(write).add_done_callback(on_done)
+
+def write_csv(df, filepath, key):
+    submit_write(df, key, functools.partial(df.to_csv, filepath, index=False, lineterminator="\n"))
+
+def write_feather(df, filepath, key):
+    # filepath has no extension; writes Arrow IPC, plus CSV if requested or pyarrow is missing
+    def write():
+        if pyarrow:
+            df.to_feather(f"{filepath}.feather")
+        if EXPORT_CSV or not pyarrow:
+            df.to_csv(f"{filepath}.csv", index=False, lineterminator="\n")
+
+    submit_write(df, key, write)
+
+def save_raw_data(city_upper, df, target_date, ts):
+    filepath = f"{RAW_DATA_DIR}/{city_upper}_raw_{ts}"
+    write_feather(df, filepath, (RAW_DATA_DIR, city_upper, target_date))
+
+def ffill_numeric(df, cols):
+    # Shallow copy is enough: filled columns are replaced, never written in place
+    df = df.copy(deep=False)
+    for col in cols:
+        arr = df[col].to_numpy()
+        mask = ~np.isnan(arr)
+        if mask.all():
+            continue
+        # Index of the last valid value at or before each row
+        idx = np.where(mask, np.arange(arr.size), 0)
+        np.maximum.accumulate(idx, out=idx)
+        df[col] = arr[idx]
+    return df
 
 def clean_data(df):
-    df_clean = df.drop_duplicates(subset=['Time']).copy()
-    df_clean.fillna(method='ffill', inplace=True)
-    return df_clean
+    # Default index keeps the frame serializable as feather
+    return ffill_numeric(df.drop_duplicates(subset=['Time'], ignore_index=True), NUMERIC_COLUMNS)
+
+def save_clean_data(city_upper, df_clean, target_date, ts):
+    filepath = f"{CLEAN_DATA_DIR}/{city_upper}_cleaned_{ts}"
+    write_feather(df_clean, filepath, (CLEAN_DATA_DIR, city_upper, target_date))
+
+def save_daily_report(city_upper, df, date_str):
+    filepath = f"{REPORT_DIR}/{city_upper}_hourly_report_{date_str}.csv"
+    write_csv(df, filepath, (REPORT_DIR, city_upper, date_str))
+
+def fetch_forecast(city_upper, target_date, today):
+    lat, lon = CITIES[city_upper]
+
+    # API: Use past_days or forecast_days if not today
+    past_days = (today - target_date).days
+    url = (
+        f"https://api.open-meteo.com/v1/forecast?"
+        f"latitude={lat}&longitude={lon}&hourly=temperature_2m,wind_speed_10m,relative_humidity_2m,precipitation&timezone=auto"
+    )
+    if past_days > 0:
+        url += f"&past_days={past_days}"
+    elif past_days < 0:
+        url += f"&forecast_days={abs(past_days)}"
+
+    response = _client.get(url)
+    data = orjson.loads(response.content) if orjson else response.json()
+
+    # Explicit dtypes skip per-column inference; JSON nulls become NaN
+    hourly = data["hourly"]
+    return pd.DataFrame({
+        "Time": pd.to_datetime(hourly["time"], format="%Y-%m-%dT%H:%M", cache=True),
+        "temperature": np.asarray(hourly["temperature_2m"], dtype=np.float32),
+        "wind_speed": np.asarray(hourly["wind_speed_10m"], dtype=np.float32),
+        "humidity": np.asarray(hourly["relative_humidity_2m"], dtype=np.float32),
+        "precipitation": np.asarray(hourly["precipitation"], dtype=np.float32)
+    }, copy=False)
+
+def cached_forecast(key, now, allow_stale):
+    with _forecast_cache_lock:
+        cached = _forecast_cache.get(key)
+    if cached and (allow_stale or now - cached[0] < FORECAST_CACHE_TTL):
+        return cached
+    return None
+
+def get_forecast_df(city_upper, target_date, now, allow_stale=False):
+    # Cached (fetched_at, df_clean); raw/clean files are only written on a fresh fetch
+    key = (city_upper, target_date)
+    cached = cached_forecast(key, now, allow_stale)
+    if cached:
+        return cached
+
+    # One fetch per key at a time; callbacks run on several threads
+    with _forecast_cache_lock:
+        fetch_lock = _fetch_locks.setdefault(key, threading.Lock())
+    with fetch_lock:
+        # Another thread may have fetched this key while we waited
+        cached = cached_forecast(key, now, allow_stale)
+        if cached:
+            return cached
+
+        # Raw and cleaned files from the same fetch share one timestamp
+        ts = now.strftime("%Y%m%d_%H%M%S")
+        df = fetch_forecast(city_upper, target_date, now.date())
+        save_raw_data(city_upper, df, target_date, ts)
+        df_clean = clean_data(df)
+        save_clean_data(city_upper, df_clean, target_date, ts)
+
+        with _forecast_cache_lock:
+            # Evict expired entries, then the oldest ones if still over capacity
+            for k in [k for k, (fetched_at, _) in _forecast_cache.items() if now - fetched_at >= FORECAST_CACHE_TTL]:
+                _forecast_cache.pop(k, None)
+            while len(_forecast_cache) >= FORECAST_CACHE_SIZE:
+                _forecast_cache.pop(next(iter(_forecast_cache)), None)
+            _forecast_cache[key] = (now, df_clean)
+            return _forecast_cache[key]
+
+# --- Day Processing Kernel ---
+# (column index into NUMERIC_COLUMNS, alert when above threshold?, label, unit, value format), in the
+# order of the thresholds passed to process_day: max temp, min temp, max wind, min humidity, precip
+# Values format with str(), which keeps the float32 shortest repr (21.3, not 21.299999237060547);
+# humidity is whole percent from the API and is shown without a decimal
+ALERT_CHECKS = [
+    (0, True, "🔥 Temp", "°C", str),
+    (0, False, "❄️ Temp", "°C", str),
+    (1, True, "🌬️ Wind", " km/h", str),
+    (2, False, "💧 Humidity", "%", "{:.0f}".format),
+    (3, True, "🌧️ Precip", " mm", str),
+]
+ALERT_COLUMNS = np.array([check[0] for check in ALERT_CHECKS], dtype=np.int64)
+ALERT_ABOVE = np.array([check[1] for check in ALERT_CHECKS], dtype=np.bool_)
+DAY_NS = 86_400 * 10**9
+HOUR_NS = 3_600 * 10**9
+
+def _process_day_loops(times_ns, metrics, day_start_ns, hour_after, last_hour_ns, thresholds, alert_columns, alert_above):
+    # Single fused pass for the numba build; see process_day for the contract
+    n = times_ns.size
+    rows = np.empty(n, np.int64)
+    count = 0
+    for i in range(n):
+        t = times_ns[i]
+        if day_start_ns <= t < day_start_ns + DAY_NS and (t // HOUR_NS) % 24 > hour_after:
+            rows[count] = i
+            count += 1
+    rows = rows[:count]
+
+    hits = np.zeros((thresholds.size, count), np.bool_)
+    max_change = np.zeros(3)
+    prev = -1
+    for j in range(count):
+        i = rows[j]
+        for k in range(thresholds.size):
+            threshold = thresholds[k]
+            if not np.isnan(threshold):
+                value = metrics[i, alert_columns[k]]
+                hits[k, j] = value > threshold if alert_above[k] else value < threshold
+        if times_ns[i] >= last_hour_ns:
+            if prev >= 0:
+                for c in range(3):
+                    change = abs(metrics[i, c] - metrics[prev, c])
+                    if change > max_change[c]:  # False for NaN, so gaps are skipped
+                        max_change[c] = change
+            prev = i
+    return rows, hits, max_change
+
+# Scratch buffers for the NumPy fallback below; the numba kernel allocates its own outputs
+SCRATCH_SIZE = 48  # hourly rows in a worst-case two-day window
+_SCRATCH_DTYPES = {"values": np.float32, "diffs": np.float32}
+_scratch = threading.local()
+
+def scratch(name, n):
+    # Preallocated buffer for intermediates that never leave _process_day_numpy;
+    # thread-local because Dash can run callbacks concurrently
+    if n > SCRATCH_SIZE:
+        return np.empty(n, _SCRATCH_DTYPES[name])
+    if not hasattr(_scratch, "buffers"):
+        _scratch.buffers = {key: np.empty(SCRATCH_SIZE, dtype) for key, dtype in _SCRATCH_DTYPES.items()}
+    return _scratch.buffers[name][:n]
+
+def _process_day_numpy(times_ns, metrics, day_start_ns, hour_after, last_hour_ns, thresholds, alert_columns, alert_above):
+    in_day = (times_ns >= day_start_ns) & (times_ns < day_start_ns + DAY_NS)
+    if hour_after >= 0:
+        in_day &= (times_ns // HOUR_NS) % 24 > hour_after
+    rows = np.flatnonzero(in_day)
+    selected = metrics[rows]
+
+    hits = np.zeros((thresholds.size, rows.size), np.bool_)
+    for k, threshold in enumerate(thresholds):
+        if not np.isnan(threshold):
+            compare = np.greater if alert_above[k] else np.less
+            compare(selected[:, alert_columns[k]], threshold, out=hits[k])
+
+    # API data is already time-ordered, so diffs run directly on the column arrays
+    max_change = np.zeros(3)
+    recent = times_ns[rows] >= last_hour_ns
+    n_recent = np.count_nonzero(recent)
+    if n_recent > 1:
+        for c in range(3):
+            values = np.compress(recent, selected[:, c], out=scratch("values", n_recent))
+            diffs = np.subtract(values[1:], values[:-1], out=scratch("diffs", n_recent - 1))
+            np.abs(diffs, out=diffs)
+            # fmax skips NaN without the copy nanmax makes
+            max_change[c] = np.fmax.reduce(diffs, initial=0.0)
+    return rows, hits, max_change
+
+# Takes int64 ns timestamps and the (n, 4) NUMERIC_COLUMNS array of the cleaned forecast.
+# Returns the row indices of the selected day (after hour_after; -1 keeps all hours),
+# hits[k, j] for ALERT_CHECKS[k] on selected row j (NaN thresholds are unset), and the
+# largest hour-to-hour change of temperature, wind and humidity since last_hour_ns.
+# No fastmath: the kernel relies on NaN semantics for gaps and unset thresholds.
+process_day = njit(cache=True)(_process_day_loops) if njit else _process_day_numpy
+
+def build_alerts(df_24h, metrics_24h, hits):
+    if not hits.any():
+        return []
+
+    # metrics_24h is the kernel's metrics array already cut to df_24h's rows; one formatting
+    # pass over the timestamps is shared by every check
+    times = df_24h["Time"].dt.strftime("%Y-%m-%d %H:%M:%S").to_numpy()
+    alerts = []
+    for (col_idx, _, label, unit, fmt), check_hits in zip(ALERT_CHECKS, hits):
+        alerts += [f"{label} {fmt(metrics_24h[i, col_idx])}{unit} at {times[i]}" for i in np.flatnonzero(check_hits)]
+    return alerts
 
-def save_clean_data(city_upper, df_clean):
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filepath = os.path.join(CLEAN_DATA_DIR, f"{city_upper}_cleaned_{timestamp}.csv")
-    df_clean.to_csv(filepath, index=False)
+def build_feature_cards(df_24h, features, temp_unit, temp_symbol):
+    temp_mean = df_24h["temperature"].mean()
+    icon_map = {
+        **STATIC_ICONS,
+        "temperature": "🔥" if temp_mean > 30 else "❄️" if temp_mean < 10 else "🌡️",
+        "precipitation": "🌧️" if df_24h["precipitation"].mean() > 1 else "☀️"
+    }
 
-def save_daily_report(city_upper, df):
-    date_str = datetime.now().strftime("%Y%m%d")
-    filepath = os.path.join(REPORT_DIR, f"{city_upper}_hourly_report_{date_str}.csv")
-    df.to_csv(filepath, index=False)
+    feature_cards = []
+    for feat in features:
+        if feat == "temperature":
+            value = temp_mean if temp_unit == "C" else (temp_mean * 9/5 + 32)
+            unit = temp_symbol
+        elif feat == "wind_speed":
+            value = df_24h["wind_speed"].mean()
+            unit = "km/h"
+        elif feat == "humidity":
+            value = df_24h["humidity"].mean()
+            unit = "%"
+        elif feat == "precipitation":
+            value = df_24h["precipitation"].sum()
+            unit = "mm"
+        else:
+            value, unit = "", ""
+        feature_cards.append(
+            dbc.Card(
+                dbc.CardBody([
+                    html.H2(icon_map[feat], style=_H2_STYLE),
+                    card_title(feat),
+                    html.P(f"{value:.1f} {unit}", className="card-text", style=_P_STYLE)
+                ]),
+                className="m-2 text-center",
+                style=_CARD_STYLE
+            )
+        )
+    return feature_cards
+
+def build_graph(df_24h, features, temp_display, temp_symbol, city_upper, target_date):
+    # Build all traces up front and hand them to the figure in one go:
+    # each add_trace call re-validates the whole figure
+    trace_data = {
+        "temperature": (temp_display, f"Temp ({temp_symbol})"),
+        "wind_speed": (df_24h["wind_speed"], "Wind Speed (km/h)"),
+        "humidity": (df_24h["humidity"], "Humidity (%)"),
+        "precipitation": (df_24h["precipitation"], "Precipitation (mm)"),
+    }
+    x_data = df_24h["Time"]
+    return go.Figure(
+        data=[go.Scattergl(x=x_data, y=trace_data[feat][0], name=trace_data[feat][1]) for feat in features],
+        layout=go.Layout(title=f"Hourly Weather Forecast - {city_upper.title()} ({target_date})",
+                         xaxis_title="Time", yaxis_title="Values")
+    )
+
+def build_table(df_24h, temp_display, temp_symbol):
+    df_table = pd.DataFrame({
+        "Time": df_24h["Time"].dt.strftime("%Y-%m-%d %H:%M").to_numpy(),
+        f"Temp ({temp_symbol})": temp_display,
+        "Wind (km/h)": df_24h["wind_speed"].to_numpy(),
+        # Whole percent, as sent by the API (65, not 65.0)
+        "Humidity (%)": df_24h["humidity"].round().astype("Int64").array,
+        "Precip (mm)": df_24h["precipitation"].to_numpy()
+    })
+    table = html.Table([
+        html.Thead(html.Tr([html.Th(col) for col in df_table.columns])),
+        # Zip the column arrays so float32 cells render via str() as 21.3, not 21.299999237060547,
+        # and humidity stays integer (to_numpy() would widen the nullable ints back to float)
+        html.Tbody([html.Tr([html.Td(str(v)) for v in row])
+                    for row in zip(*(df_table[col].array for col in df_table.columns))])
+    ], className="table table-striped table-bordered table-hover mt-3")
+    return df_table, table
+
+def render_visual_mode(visual_mode, feature_cards, fig):
+    # Returns (figure, graph style, icons div) for the selected Graph/Icons mode
+    if visual_mode == "icons":
+        return go.Figure(), {"display": "none"}, html.Div(feature_cards, style={"display": "flex", "justify-content": "center"})
+    return fig, {"display": "block"}, html.Div()
 
 # --- Callbacks ---
 
@@ -190,7 +544,8 @@ def toggle_calendar_modal(open_clicks, selected_date, is_open):
      Output("alert-popup", "message"),
      Output("alert-popup", "displayed"),
      Output("summary-widget", "children"),
-     Output("forecast-table", "children")],
+     Output("forecast-table", "children"),
+     Output("render-signature", "data")],
     [Input("submit-button", "n_clicks"),
      Input("date-picker", "date"),
      Input("visual-mode-radio", "value")],
@@ -202,185 +557,117 @@ def toggle_calendar_modal(open_clicks, selected_date, is_open):
      State("temp-unit-selector", "value"),
      State("precip-threshold", "value"),
      State("detailed-feature-radio", "value"),
-     State("alert-start-hour", "value")]
+     State("alert-start-hour", "value"),
+     State("render-signature", "data")]
 )
 def update_forecast(n_clicks, selected_date, visual_mode, city, max_temp, min_temp, max_wind, min_humidity,
-                    temp_unit, precip_threshold, detailed_feature, alert_start_hour):
+                    temp_unit, precip_threshold, detailed_feature, alert_start_hour, last_signature):
     ctx = callback_context
     if not city:
-        return dash.no_update
+        return (dash.no_update,) * len(ctx.outputs_list)
 
     city_upper = city.upper()
-    lat, lon = CITIES[city_upper]
+    last_signature = last_signature or {}
+    # Single clock read per request, shared by the date logic, summary and file names
+    now = datetime.now()
 
     # Determine which input triggered the callback
-    today = datetime.now().date()
-    target_date = today
+    target_date = now.date()
     if ctx.triggered and any("date-picker" in trig['prop_id'] for trig in ctx.triggered) and selected_date:
         target_date = datetime.strptime(selected_date, "%Y-%m-%d").date()
 
-    # API: Use past_days or forecast_days if not today
-    past_days = (today - target_date).days
-    url = (
-        f"https://api.open-meteo.com/v1/forecast?"
-        f"latitude={lat}&longitude={lon}&hourly=temperature_2m,wind_speed_10m,relative_humidity_2m,precipitation&timezone=auto"
+    # Toggling Graph/Icons only swaps which of the last rendered views is shown
+    visual_mode_only = bool(ctx.triggered) and all(
+        trig['prop_id'].startswith("visual-mode-radio") for trig in ctx.triggered
     )
-    if past_days > 0:
-        url += f"&past_days={past_days}"
-    elif past_days < 0:
-        url += f"&forecast_days={abs(past_days)}"
-
-    response = requests.get(url)
-    data = response.json()
-
-    df = pd.DataFrame({
-        "Time": pd.to_datetime(data["hourly"]["time"]),
-        "temperature": data["hourly"]["temperature_2m"],
-        "wind_speed": data["hourly"]["wind_speed_10m"],
-        "humidity": data["hourly"]["relative_humidity_2m"],
-        "precipitation": data["hourly"]["precipitation"]
-    })
-
-    save_raw_data(city_upper, df)
-    df_clean = clean_data(df)
-    save_clean_data(city_upper, df_clean)
-
-    # Only data for selected date
-    df_24h = df_clean[df_clean["Time"].dt.date == target_date].copy()
-    df_24h["temperature_F"] = df_24h["temperature"] * 9/5 + 32
-
-    # Filter for hours after alert_start_hour if set
-    if alert_start_hour is not None:
-        df_24h = df_24h[df_24h["Time"].dt.hour > alert_start_hour]
-
-    # --- ICONS for summary ---
-    icon_map = {
-        "temperature": "🔥" if df_24h["temperature"].mean() > 30 else "❄️" if df_24h["temperature"].mean() < 10 else "🌡️",
-        "wind_speed": "🌬️",
-        "humidity": "💧",
-        "precipitation": "🌧️" if df_24h["precipitation"].mean() > 1 else "☀️"
-    }
-    feature_labels = {
-        "temperature": "Temperature",
-        "wind_speed": "Wind Speed",
-        "humidity": "Humidity",
-        "precipitation": "Precipitation"
-    }
-
-    # Prepare icon cards for all four features
-    feature_cards = []
-    if detailed_feature == "all":
-        features = ["temperature", "wind_speed", "humidity", "precipitation"]
-    else:
-        features = [detailed_feature]
-
-    for feat in features:
-        if feat == "temperature":
-            value = df_24h["temperature"].mean() if temp_unit == "C" else (df_24h["temperature"].mean() * 9/5 + 32)
-            unit = "°C" if temp_unit == "C" else "°F"
-        elif feat == "wind_speed":
-            value = df_24h["wind_speed"].mean()
-            unit = "km/h"
-        elif feat == "humidity":
-            value = df_24h["humidity"].mean()
-            unit = "%"
-        elif feat == "precipitation":
-            value = df_24h["precipitation"].sum()
-            unit = "mm"
-        else:
-            value, unit = "", ""
-        feature_cards.append(
-            dbc.Card(
-                dbc.CardBody([
-                    html.H2(icon_map[feat], style={"font-size": "3rem"}),
-                    html.H4(f"{feature_labels[feat]}", className="card-title"),
-                    html.P(f"{value:.1f} {unit}", className="card-text", style={"font-size": "1.5rem", "font-weight": "bold"})
-                ]),
-                className="m-2 text-center",
-                style={"width": "10rem", "display": "inline-block"}
-            )
-        )
-
-    # --- Choose what to display ---
-    if visual_mode == "icons":
-        fig = go.Figure()  # Empty figure
-        graph_style = {"display": "none"}
-        icons_div = html.Div(feature_cards, style={"display": "flex", "justify-content": "center"})
+    if visual_mode_only and last_signature.get("view"):
+        # _last_render is shared by all sessions, so look up the exact render this browser shows
+        render_key = last_signature["view"][:-1]
+        with _last_render_lock:
+            cached_render = _last_render.get(tuple(render_key))
+        if cached_render:
+            feature_cards, graph_fig = cached_render
+            fig, graph_style, icons_div = render_visual_mode(visual_mode, feature_cards, graph_fig)
+            signature = {**last_signature, "view": render_key + [visual_mode]}
+            return (fig, graph_style, icons_div) + (dash.no_update,) * 4 + (signature,)
+        # Rebuild for the date on screen, so a toggle never switches the view to today
+        target_date = datetime.strptime(render_key[1], "%Y-%m-%d").date()
+
+    # If there is nothing to reuse, at least avoid refetching an expired forecast
+    fetched_at, df_clean = get_forecast_df(city_upper, target_date, now, allow_stale=visual_mode_only)
+
+    # Day/hour selection, threshold scans and last-hour changes in one kernel call.
+    # Thresholds use the metrics' float32 dtype: comparing against float64 would widen
+    # readings like float32(21.3) to 21.2999... and change which alerts fire (None -> NaN)
+    metrics = df_clean[NUMERIC_COLUMNS].to_numpy()
+    rows, alert_hits, max_change = process_day(
+        df_clean["Time"].to_numpy().astype("datetime64[ns]").view(np.int64),
+        metrics,
+        np.datetime64(target_date, "ns").astype(np.int64),
+        -1.0 if alert_start_hour is None else float(alert_start_hour),
+        np.datetime64(now - timedelta(hours=1), "ns").astype(np.int64),
+        np.array([max_temp, min_temp, max_wind, min_humidity, precip_threshold], dtype=metrics.dtype),
+        ALERT_COLUMNS,
+        ALERT_ABOVE,
+    )
+    # Only data for selected date, after alert_start_hour if set
+    df_24h = df_clean.iloc[rows]
+
+    # Temperature in the selected unit, converted once for the card, graph and table
+    temp_symbol = "°C" if temp_unit == "C" else "°F"
+    temp_display = df_24h["temperature"].to_numpy()
+    if temp_unit == "F":
+        # Own array (it ends up in the figure and table), but converted in place after one allocation
+        temp_display = np.multiply(temp_display, 9.0 / 5.0, dtype=np.float32)
+        np.add(temp_display, 32.0, out=temp_display)
+
+    # Per-output signatures (kept client-side in render-signature): outputs whose
+    # inputs match what this browser already shows are returned as no_update
+    data_key = [city_upper, str(target_date), fetched_at.isoformat(), alert_start_hour, temp_unit]
+    signature = {"view": data_key + [detailed_feature, visual_mode], "table": data_key}
+
+    # --- Icons & graph (both built so a later Graph/Icons toggle can reuse them) ---
+    if signature["view"] == last_signature.get("view"):
+        fig = graph_style = icons_div = dash.no_update
     else:
-        # Original plotting code
-        fig = go.Figure()
-        if "temperature" in features:
-            y_data = df_24h["temperature"] if temp_unit == "C" else df_24h["temperature"] * 9/5 + 32
-            unit = "°C" if temp_unit == "C" else "°F"
-            fig.add_trace(go.Scatter(x=df_24h["Time"], y=y_data, name=f"Temp ({unit})"))
-        if "wind_speed" in features:
-            fig.add_trace(go.Scatter(x=df_24h["Time"], y=df_24h["wind_speed"], name="Wind Speed (km/h)"))
-        if "humidity" in features:
-            fig.add_trace(go.Scatter(x=df_24h["Time"], y=df_24h["humidity"], name="Humidity (%)"))
-        if "precipitation" in features:
-            fig.add_trace(go.Scatter(x=df_24h["Time"], y=df_24h["precipitation"], name="Precipitation (mm)"))
-        fig.update_layout(title=f"Hourly Weather Forecast - {city_upper.title()} ({target_date})",
-                          xaxis_title="Time", yaxis_title="Values")
-        graph_style = {"display": "block"}
-        icons_div = html.Div()  # Empty
-
-    # Alerts (only for hours after alert_start_hour)
-    alerts = []
-    if max_temp is not None:
-        exceeded = df_24h[df_24h["temperature"] > max_temp]
-        alerts += [f"🔥 Temp {row.temperature}°C at {row.Time}" for row in exceeded.itertuples()]
-    if min_temp is not None:
-        below = df_24h[df_24h["temperature"] < min_temp]
-        alerts += [f"❄️ Temp {row.temperature}°C at {row.Time}" for row in below.itertuples()]
-    if max_wind is not None:
-        windy = df_24h[df_24h["wind_speed"] > max_wind]
-        alerts += [f"🌬️ Wind {row.wind_speed} km/h at {row.Time}" for row in windy.itertuples()]
-    if min_humidity is not None:
-        dry = df_24h[df_24h["humidity"] < min_humidity]
-        alerts += [f"💧 Humidity {row.humidity}% at {row.Time}" for row in dry.itertuples()]
-    if precip_threshold is not None:
-        precip_exceeded = df_24h[df_24h["precipitation"] > precip_threshold]
-        alerts += [f"🌧️ Precip {row.precipitation} mm at {row.Time}" for row in precip_exceeded.itertuples()]
+        features = NUMERIC_COLUMNS if detailed_feature == "all" else [detailed_feature]
+        feature_cards = build_feature_cards(df_24h, features, temp_unit, temp_symbol)
+        graph_fig = build_graph(df_24h, features, temp_display, temp_symbol, city_upper, target_date)
+        render_key = tuple(data_key + [detailed_feature])
+        with _last_render_lock:
+            # Re-insert so a rebuilt key counts as newest, then drop the oldest renders over capacity
+            _last_render.pop(render_key, None)
+            while len(_last_render) >= FORECAST_CACHE_SIZE:
+                _last_render.pop(next(iter(_last_render)), None)
+            _last_render[render_key] = (feature_cards, graph_fig)
+        fig, graph_style, icons_div = render_visual_mode(visual_mode, feature_cards, graph_fig)
+
+    # Alerts (only for hours after alert_start_hour); always returned so Submit can re-open the popup
+    alerts = build_alerts(df_24h, metrics[rows], alert_hits)
 
     alert_message = "\n".join(alerts) if alerts else ""
     alert_displayed = bool(alerts)
 
     # Summary widget
-    last_hour = datetime.now() - timedelta(hours=1)
-    df_last_hour = df_24h[df_24h["Time"] >= last_hour]
-    df_last_hour = df_last_hour.sort_values("Time")
-    df_last_hour["temp_diff"] = df_last_hour["temperature"].diff().abs()
-    df_last_hour["wind_diff"] = df_last_hour["wind_speed"].diff().abs()
-    df_last_hour["humidity_diff"] = df_last_hour["humidity"].diff().abs()
-
-    max_change = df_last_hour[["temp_diff", "wind_diff", "humidity_diff"]].max()
-    biggest_change_metric = max_change.idxmax()
-    biggest_change_value = max_change.max()
-
     summary_text = "No significant changes in last hour."
-    if biggest_change_value and biggest_change_value > 0:
-        if biggest_change_metric == "temp_diff":
+    biggest_change_metric = int(np.argmax(max_change))
+    biggest_change_value = max_change[biggest_change_metric]
+    if biggest_change_value > 0:
+        if biggest_change_metric == 0:
             summary_text = f"Temperature changed by {biggest_change_value:.1f} °C in last hour."
-        elif biggest_change_metric == "wind_diff":
+        elif biggest_change_metric == 1:
             summary_text = f"Wind Speed changed by {biggest_change_value:.2f} km/h in last hour."
-        elif biggest_change_metric == "humidity_diff":
+        else:
             summary_text = f"Humidity changed by {biggest_change_value:.2f}% in last hour."
 
     # Hourly summary table
-    df_table = df_24h.copy()
-    df_table["Time"] = df_table["Time"].dt.strftime("%Y-%m-%d %H:%M")
-    if temp_unit == "C":
-        df_table = df_table[["Time", "temperature", "wind_speed", "humidity", "precipitation"]]
-        df_table.rename(columns={"temperature": "Temp (°C)", "wind_speed": "Wind (km/h)", "humidity": "Humidity (%)", "precipitation": "Precip (mm)"}, inplace=True)
+    if signature["table"] == last_signature.get("table"):
+        table = dash.no_update
     else:
-        df_table["Temp (°F)"] = df_table["temperature"] * 9/5 + 32
-        df_table = df_table[["Time", "Temp (°F)", "wind_speed", "humidity", "precipitation"]]
-        df_table.rename(columns={"wind_speed": "Wind (km/h)", "humidity": "Humidity (%)", "precipitation": "Precip (mm)"}, inplace=True)
-
-    save_daily_report(city_upper, df_table)
-    table = dbc.Table.from_dataframe(df_table, striped=True, bordered=True, hover=True, class_name="mt-3")
+        df_table, table = build_table(df_24h, temp_display, temp_symbol)
+        save_daily_report(city_upper, df_table, now.strftime("%Y%m%d"))
 
-    return fig, graph_style, icons_div, alert_message, alert_displayed, summary_text, table
+    return fig, graph_style, icons_div, alert_message, alert_displayed, summary_text, table, signature
 
 # 3. Reset Button
 @app.callback(
@@ -398,7 +685,7 @@ def update_forecast(n_clicks, selected_date, visual_mode, city, max_temp, min_te
 def reset_inputs(n):
     if n:
         return "NEW YORK", "all", "C", None, None, None, None, None, None
-    return dash.no_update
+    return (dash.no_update,) * 9
 
 if __name__ == "__main__":
     app.run(debug=True)